@@ -1,7 +1,7 @@
 {
     "name": "Synchronize models with external Odoo",
     "category": "Tools",
-    "version": "12.0.1.0",
+    "version": "12.0.1.1",
     "author": "TechnoLibre",
     "license": "AGPL-3",
     "website": "https://technolibre.ca",
@@ -11,8 +11,13 @@
     },
     "data": [
         "security/ir.model.access.csv",
+        "data/ir_cron.xml",
         "views/sync_db_result.xml",
+        "views/sync_db_run.xml",
         "views/sync_db.xml",
+        "views/sync_db_fleet.xml",
+        "wizards/sync_db_benchmark.xml",
+        "wizards/sync_db_snapshot.xml",
         "views/menu.xml",
     ],
     "installable": True,
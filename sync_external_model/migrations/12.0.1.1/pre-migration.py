@@ -0,0 +1,12 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+from odoo.tools.sql import table_exists
+
+
+def migrate(cr, version):
+    # Differences are now stored by record in diff_values, remove the
+    # results by field and the watermarks to compare everything again
+    cr.execute("DELETE FROM sync_db_result WHERE type_result = 'diff_value'")
+    # Watermarks are new in this version when upgrading from 12.0.1.0
+    if table_exists(cr, "sync_db_watermark"):
+        cr.execute("DELETE FROM sync_db_watermark")
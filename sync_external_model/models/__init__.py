@@ -1,3 +1,13 @@
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl)
 
-from . import sync_db, sync_db_result
+from . import (
+    sync_db,
+    sync_db_benchmark_record,
+    sync_db_fleet,
+    sync_db_id_map,
+    sync_db_model,
+    sync_db_result,
+    sync_db_run,
+    sync_db_run_stat,
+    sync_db_watermark,
+)
@@ -0,0 +1,26 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+from odoo import fields, models
+
+
+class SyncDBBenchmarkRecord(models.Model):
+    _name = "sync.db.benchmark.record"
+    _description = "Synthetic record compared by the sync benchmark"
+
+    name = fields.Char()
+
+    value = fields.Integer()
+
+    amount = fields.Float()
+
+    note = fields.Text()
+
+    is_active = fields.Boolean()
+
+    date = fields.Date()
+
+
+class SyncDBBenchmarkRemote(models.Model):
+    _name = "sync.db.benchmark.remote"
+    _inherit = "sync.db.benchmark.record"
+    _description = "Records served by the fake remote of the sync benchmark"
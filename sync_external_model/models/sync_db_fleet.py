@@ -0,0 +1,160 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class LocalSnapshot:
+    """Local records read once by a fleet, shared by the comparisons with
+    all remotes.
+
+    Pages of a model are loaded by the first comparison which needs them,
+    the others wait for them and reuse them. Pages are read-only. An entry
+    is released when all remotes have taken it, or when the remotes which
+    didn't take it are finished, the pages are freed when the last
+    comparison using them is done.
+    """
+
+    def __init__(self, nb_consumer):
+        self._lock = threading.Lock()
+        self._dct_entry = {}
+        self.nb_consumer = nb_consumer
+
+    def get_pages(self, sync_db, model_name, lst_field, page_size, domain):
+        key = (model_name, tuple(lst_field), page_size, repr(domain))
+        with self._lock:
+            if key not in self._dct_entry:
+                # [lock, pages, number of remotes which took them]
+                self._dct_entry[key] = [threading.Lock(), None, 0]
+            entry = self._dct_entry[key]
+            entry[2] += 1
+            if entry[2] >= self.nb_consumer:
+                del self._dct_entry[key]
+        with entry[0]:
+            if entry[1] is None:
+                entry[1] = list(
+                    sync_db._iter_local_snapshots(
+                        model_name, lst_field, page_size, domain=domain
+                    )
+                )
+        return iter(entry[1])
+
+    def release_consumer(self):
+        """A remote is finished, entries taken by all others are released."""
+        with self._lock:
+            self.nb_consumer -= 1
+            for key in [
+                key
+                for key, entry in self._dct_entry.items()
+                if entry[2] >= self.nb_consumer
+            ]:
+                del self._dct_entry[key]
+
+
+class SyncDBFleet(models.Model):
+    _name = "sync.db.fleet"
+    _description = "Sync db comparison of local with many remotes"
+
+    name = fields.Char(required=True)
+
+    sync_db_ids = fields.Many2many(
+        comodel_name="sync.db",
+        string="Remotes",
+        help=(
+            "Each remote is compared with its own connection and settings,"
+            " local records of a model are read once for all of them."
+        ),
+    )
+
+    worker_count = fields.Integer(
+        default=4,
+        help="Number of remotes compared in parallel.",
+    )
+
+    sync_db_run_ids = fields.One2many(
+        comodel_name="sync.db.run",
+        inverse_name="sync_db_fleet_id",
+        string="Runs",
+    )
+
+    @api.multi
+    def action_sync(self):
+        """Queue the comparison of local with all remotes, executed
+        concurrently by the scheduled action."""
+        for rec in self:
+            for sync_db in rec.sync_db_ids:
+                self.env["sync.db.run"].create(
+                    {
+                        "sync_db_id": sync_db.id,
+                        "sync_db_fleet_id": rec.id,
+                        "in_background": True,
+                    }
+                )
+
+    @api.multi
+    def _execute_runs(self, runs):
+        """Execute queued runs of this fleet concurrently, local records of
+        a model are read once for all of them."""
+        self.ensure_one()
+        start_time = time.time()
+        # Workers have their own cursor
+        self.env.cr.commit()
+        snapshot = LocalSnapshot(len(runs))
+        with ThreadPoolExecutor(
+            max_workers=max(self.worker_count, 1)
+        ) as executor:
+            lst_future = [
+                executor.submit(self._execute_run_worker, run.id, snapshot)
+                for run in runs
+            ]
+            for future in as_completed(lst_future):
+                future.result()
+        _logger.info(
+            f"Fleet '{self.name}' compared {len(runs)} remotes in"
+            f" {time.time() - start_time:.3f}s"
+        )
+        self.invalidate_cache()
+
+    def _execute_run_worker(self, run_id, snapshot):
+        # An error of a remote is kept on its run, like in background
+        try:
+            with api.Environment.manage(), self.pool.cursor() as cr:
+                env = api.Environment(
+                    cr,
+                    self.env.uid,
+                    dict(self.env.context, sync_db_snapshot=snapshot),
+                )
+                env["sync.db.run"].browse(run_id)._execute()
+        finally:
+            snapshot.release_consumer()
+
+    @api.multi
+    def action_show_matrix(self):
+        """Show results of the last run of each remote, by model and by
+        remote."""
+        self.ensure_one()
+        lst_run_id = []
+        for sync_db in self.sync_db_ids:
+            run = self.sync_db_run_ids.filtered(
+                lambda r: r.sync_db_id == sync_db
+            )[:1]
+            if run:
+                lst_run_id.append(run.id)
+        return {
+            "name": self.name,
+            "type": "ir.actions.act_window",
+            "res_model": "sync.db.result",
+            "view_mode": "pivot,tree",
+            "domain": [("sync_db_run_id", "in", lst_run_id)],
+            "context": {
+                "pivot_measures": ["__count__"],
+                "pivot_row_groupby": ["model_name", "type_result"],
+                "pivot_column_groupby": ["sync_db_id"],
+            },
+        }
@@ -0,0 +1,153 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+from odoo import api, fields, models
+
+
+class IdMap:
+    """Local and remote ids of a sync.db, loaded lazily by model.
+
+    Only records with a different id on both sides are mapped, a record
+    without mapping has the same id on both sides.
+    """
+
+    def __init__(self, env, sync_db_id):
+        self.env = env
+        self.sync_db_id = sync_db_id
+        self._dct_local_to_remote = {}
+        self._dct_remote_to_local = {}
+
+    def get_local_to_remote(self, model_name):
+        if model_name not in self._dct_local_to_remote:
+            dct_map = {
+                a.get("local_id"): a.get("remote_id")
+                for a in self.env["sync.db.id.map"].search_read(
+                    [
+                        ("sync_db_id", "=", self.sync_db_id),
+                        ("model_name", "=", model_name),
+                    ],
+                    ["local_id", "remote_id"],
+                )
+            }
+            self._dct_local_to_remote[model_name] = dct_map
+            self._dct_remote_to_local[model_name] = {
+                v: k for k, v in dct_map.items()
+            }
+        return self._dct_local_to_remote[model_name]
+
+    def get_remote_to_local(self, model_name):
+        self.get_local_to_remote(model_name)
+        return self._dct_remote_to_local[model_name]
+
+    def to_remote(self, model_name, local_id):
+        return self.get_local_to_remote(model_name).get(local_id, local_id)
+
+    def to_local(self, model_name, remote_id):
+        return self.get_remote_to_local(model_name).get(remote_id, remote_id)
+
+    def add(self, model_name, local_id, remote_id, xml_id=False):
+        """Map a local id to a remote id, ignore the same id."""
+        self.add_many(model_name, [(local_id, remote_id)], xml_id=xml_id)
+
+    def add_many(self, model_name, lst_pair, xml_id=False):
+        """Map [(local_id, remote_id)] with a single create."""
+        lst_pair = [
+            (local_id, remote_id)
+            for local_id, remote_id in lst_pair
+            if local_id != remote_id
+        ]
+        if not lst_pair:
+            return
+        self.env["sync.db.id.map"].create(
+            [
+                {
+                    "sync_db_id": self.sync_db_id,
+                    "model_name": model_name,
+                    "local_id": local_id,
+                    "remote_id": remote_id,
+                    "xml_id": xml_id,
+                }
+                for local_id, remote_id in lst_pair
+            ]
+        )
+        dct_local_to_remote = self.get_local_to_remote(model_name)
+        dct_remote_to_local = self.get_remote_to_local(model_name)
+        for local_id, remote_id in lst_pair:
+            dct_local_to_remote[local_id] = remote_id
+            dct_remote_to_local[remote_id] = local_id
+
+    def translate_vals(self, model, vals, to_remote=True):
+        """Translate ids of relational values of model, in place."""
+        fct_map = self.to_remote if to_remote else self.to_local
+        for field_name, value in vals.items():
+            field = model._fields.get(field_name)
+            if not field or not field.relational or not value:
+                continue
+            comodel_name = field.comodel_name
+            if type(value) is int:
+                vals[field_name] = fct_map(comodel_name, value)
+            elif type(value) in (list, tuple):
+                vals[field_name] = [
+                    self._translate_command(fct_map, comodel_name, a)
+                    for a in value
+                ]
+        return vals
+
+    @staticmethod
+    def _translate_command(fct_map, comodel_name, command):
+        if type(command) is int:
+            return fct_map(comodel_name, command)
+        if type(command) in (list, tuple) and command and command[0] == 6:
+            return (
+                6,
+                0,
+                [fct_map(comodel_name, a) for a in command[2]],
+            )
+        if type(command) in (list, tuple) and command and command[0] == 4:
+            return (4, fct_map(comodel_name, command[1]))
+        return command
+
+
+class SyncDBIdMap(models.Model):
+    _name = "sync.db.id.map"
+    _description = "Sync db mapping of local id to remote id"
+    _order = "model_name, local_id"
+
+    name = fields.Char(
+        compute="_compute_name",
+        store=True,
+    )
+
+    sync_db_id = fields.Many2one(
+        comodel_name="sync.db",
+        string="Sync DB",
+        required=True,
+        index=True,
+        ondelete="cascade",
+    )
+
+    model_name = fields.Char(required=True, index=True)
+
+    local_id = fields.Integer(required=True)
+
+    remote_id = fields.Integer(required=True)
+
+    xml_id = fields.Char(help="External id matching both records, if any.")
+
+    _sql_constraints = [
+        (
+            "sync_db_model_local_uniq",
+            "unique(sync_db_id, model_name, local_id)",
+            "This local record is already mapped.",
+        ),
+        (
+            "sync_db_model_remote_uniq",
+            "unique(sync_db_id, model_name, remote_id)",
+            "This remote record is already mapped.",
+        ),
+    ]
+
+    @api.multi
+    @api.depends("model_name", "local_id", "remote_id")
+    def _compute_name(self):
+        for rec in self:
+            rec.name = f"{rec.model_name} {rec.local_id} -> {rec.remote_id}"
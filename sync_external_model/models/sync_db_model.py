@@ -0,0 +1,123 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+from odoo import _, api, exceptions, fields, models
+from odoo.tools.safe_eval import safe_eval
+
+
+class SyncDBModel(models.Model):
+    _name = "sync.db.model"
+    _description = "Sync db fields and records compared by model"
+    _order = "model_name"
+
+    name = fields.Char(
+        compute="_compute_name",
+        store=True,
+    )
+
+    sync_db_id = fields.Many2one(
+        comodel_name="sync.db",
+        string="Sync DB",
+        required=True,
+        index=True,
+        ondelete="cascade",
+    )
+
+    model_name = fields.Char(required=True)
+
+    field_mode = fields.Selection(
+        selection=[
+            ("all", "All"),
+            ("white", "White"),
+            ("black", "Black"),
+        ],
+        default="all",
+        required=True,
+        help=(
+            "All, compare all fields of the module. White, compare only"
+            " listed fields. Black, compare all fields except listed fields."
+            " With white or black, only compared fields are read on remote."
+        ),
+    )
+
+    field_names = fields.Char(
+        help="Separate by ; for multiple fields.",
+    )
+
+    domain = fields.Char(
+        default="[]",
+        help=(
+            "Only matching records are read on remote and local. A record"
+            " matching on a single side is reported missing on the other."
+        ),
+    )
+
+    _sql_constraints = [
+        (
+            "sync_db_model_uniq",
+            "unique(sync_db_id, model_name)",
+            "Fields and records are already configured for this model.",
+        ),
+    ]
+
+    @api.multi
+    @api.depends("model_name")
+    def _compute_name(self):
+        for rec in self:
+            rec.name = rec.model_name
+
+    @api.multi
+    @api.constrains("domain")
+    def _check_domain(self):
+        for rec in self:
+            try:
+                rec.get_domain()
+            except Exception as e:
+                raise exceptions.ValidationError(
+                    _(f"Wrong domain for model '{rec.model_name}': {e}")
+                )
+
+    @api.model
+    def create(self, vals):
+        rec = super().create(vals)
+        rec._reset_watermark()
+        return rec
+
+    @api.multi
+    def write(self, vals):
+        # Compared fields and records change, compare all again
+        self._reset_watermark()
+        result = super().write(vals)
+        self._reset_watermark()
+        return result
+
+    @api.multi
+    def unlink(self):
+        self._reset_watermark()
+        return super().unlink()
+
+    @api.multi
+    def _reset_watermark(self):
+        for rec in self:
+            self.env["sync.db.watermark"].search(
+                [
+                    ("sync_db_id", "=", rec.sync_db_id.id),
+                    ("model_name", "=", rec.model_name),
+                ]
+            ).unlink()
+
+    @api.multi
+    def filter_fields(self, lst_field):
+        self.ensure_one()
+        set_field_name = {
+            a.strip() for a in (self.field_names or "").split(";") if a
+        }
+        if self.field_mode == "white":
+            return [a for a in lst_field if a in set_field_name]
+        if self.field_mode == "black":
+            return [a for a in lst_field if a not in set_field_name]
+        return lst_field
+
+    @api.multi
+    def get_domain(self):
+        self.ensure_one()
+        return safe_eval(self.domain or "[]")
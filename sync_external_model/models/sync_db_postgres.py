@@ -0,0 +1,293 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+import io
+import re
+import threading
+
+from odoo import SUPERUSER_ID, _, exceptions, sql_db
+from odoo.osv import expression
+
+from .sync_db_snapshot_file import match_domain
+
+# Escapes of the text format of COPY
+COPY_ESCAPE = {
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+    "v": "\v",
+}
+COPY_ESCAPE_RE = re.compile(r"\\(.)")
+
+
+def _unescape_copy(value):
+    return COPY_ESCAPE_RE.sub(
+        lambda m: COPY_ESCAPE.get(m.group(1), m.group(1)), value
+    )
+
+
+class PostgresRemoteOdoo:
+    """Stand-in of odoorpc.ODOO reading the remote database directly.
+
+    Records are pulled with COPY ... TO STDOUT, the same COPY read local
+    records when comparing, both sides get the same types. Domains are
+    translated in SQL by the local ORM, the remote has the same schema for
+    the compared models, their leaves must compare a column with values.
+    Values are like read by RPC, except the name of a many2one which is
+    empty. Binaries are compared by checksum read on each
+    database, the checksum of an attachment is in ir_attachment. The remote
+    is only read, a resolution on remote need the JSON-RPC engine.
+    """
+
+    def __init__(self, sync_db, db_uri):
+        self.sync_db = sync_db
+        self._lock = threading.Lock()
+        self._cr = sql_db.db_connect(db_uri, allow_uri=True).cursor()
+        self._cr.execute(
+            "SELECT latest_version FROM ir_module_module WHERE name = 'base'"
+        )
+        row = self._cr.fetchone()
+        self.version = row[0] if row else False
+
+    def login(self, db, login, password):
+        return True
+
+    def json(self, url, params):
+        return {"result": {"uid": SUPERUSER_ID}}
+
+    def execute_kw(self, model_name, method, args, kwargs=None):
+        kwargs = kwargs or {}
+        with self._lock:
+            if model_name == "sync.db":
+                if method == "get_sync_model_fingerprint":
+                    return self.sync_db._get_table_fingerprint(
+                        self._cr, self.sync_db.env[args[0]]._table
+                    )
+                # Binaries are compared by checksum, attachments are not
+                # columns
+                if method == "get_sync_binary_checksums":
+                    return list(
+                        self.sync_db._get_binary_checksums(
+                            *args, cr=self._cr
+                        ).items()
+                    )
+                if method == "get_sync_binary_chunks":
+                    return list(
+                        self.sync_db._get_binary_chunks(
+                            *args, cr=self._cr
+                        ).items()
+                    )
+                # Hashes are computed by RPC
+                raise exceptions.Warning(
+                    _("Method {} is not available on PostgreSQL.").format(
+                        method
+                    )
+                )
+            if method not in ("search_read", "search"):
+                raise exceptions.Warning(
+                    _(
+                        "PostgreSQL engine is read-only, cannot {} on {}."
+                    ).format(method, model_name)
+                )
+            domain = args[0] if args else []
+            if model_name in (
+                "ir.module.module",
+                "ir.model",
+                "ir.model.fields",
+                "ir.model.data",
+            ):
+                lst_v = [
+                    a
+                    for a in self._read_metadata(model_name, domain)
+                    if match_domain(a, domain)
+                ]
+            else:
+                lst_v = self.read_copy(
+                    self._cr,
+                    model_name,
+                    kwargs.get("fields") or [],
+                    domain,
+                    limit=kwargs.get("limit"),
+                    is_remote=True,
+                )
+            if method == "search":
+                return [a.get("id") for a in lst_v]
+            return lst_v
+
+    def _read_metadata(self, model_name, domain):
+        if model_name == "ir.module.module":
+            # installed_version is the version on disk of remote, unknown
+            sql = (
+                "SELECT id, name, state, latest_version,"
+                " NULL AS installed_version FROM ir_module_module"
+            )
+        elif model_name == "ir.model":
+            sql = "SELECT id, model FROM ir_model"
+        elif model_name == "ir.model.fields":
+            sql = (
+                "SELECT id, model, name, ttype, relation FROM ir_model_fields"
+            )
+        else:
+            lst_model_name = [
+                leaf[2]
+                for leaf in domain
+                if isinstance(leaf, (list, tuple))
+                and list(leaf[:2]) == ["model", "="]
+            ]
+            if not lst_model_name:
+                raise exceptions.Warning(
+                    _("External ids are only read by model.")
+                )
+            self._cr.execute(
+                "SELECT id, model, module, name, res_id FROM ir_model_data"
+                " WHERE model = %s",
+                (lst_model_name[0],),
+            )
+            return self._cr.dictfetchall()
+        self._cr.execute(sql)
+        return [
+            {a: v if v is not None else False for a, v in row.items()}
+            for row in self._cr.dictfetchall()
+        ]
+
+    def read_copy(
+        self, cr, model_name, lst_field, domain, limit=None, is_remote=False
+    ):
+        """Read records matching domain sorted by id, with a single COPY.
+
+        Local records are like read by sync.db _read_snapshot, remote
+        records like read by RPC.
+        """
+        model = self.sync_db.env[model_name]
+        table = model._table
+        lst_field = ["id"] + [a for a in lst_field if a != "id"]
+        lst_column = []
+        for field_name in lst_field:
+            field = model._fields[field_name]
+            if field.type == "many2many":
+                lst_column.append(
+                    f'(SELECT array_agg("{field.column2}" ORDER BY'
+                    f' "{field.column2}") FROM "{field.relation}" WHERE'
+                    f' "{field.column1}" = "{table}".id)'
+                )
+            elif not field.column_type or getattr(field, "attachment", False):
+                raise exceptions.Warning(
+                    _(
+                        "Field '{}' of model '{}' is not a column, cannot"
+                        " compare it with PostgreSQL."
+                    ).format(field_name, model_name)
+                )
+            else:
+                lst_column.append(f'"{table}"."{field_name}"')
+        self._check_domain(model, domain)
+        from_clause, where_clause, params = model._where_calc(domain).get_sql()
+        sql = (
+            f"SELECT {', '.join(lst_column)} FROM {from_clause}"
+            f"{' WHERE ' + where_clause if where_clause else ''}"
+            f' ORDER BY "{table}".id'
+        )
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        buffer = io.BytesIO()
+        cr.copy_expert(
+            cr.mogrify(f"COPY ({sql}) TO STDOUT", params).decode(), buffer
+        )
+        lst_converter = [
+            self._get_converter(model._fields[a], is_remote) for a in lst_field
+        ]
+        lst_v = []
+        # Rows end by a newline, other line breaks of values are escaped
+        for line in buffer.getvalue().decode().split("\n")[:-1]:
+            lst_v.append(
+                {
+                    field_name: converter(
+                        None if value == "\\N" else _unescape_copy(value)
+                    )
+                    for field_name, converter, value in zip(
+                        lst_field, lst_converter, line.split("\t")
+                    )
+                }
+            )
+        return lst_v
+
+    @staticmethod
+    def _check_domain(model, domain):
+        """Refuse a leaf not comparing a column of the model with values.
+
+        The SQL is computed by the local ORM, a dotted path, child_of or a
+        name searched on a relation would be resolved in local ids.
+        """
+        for leaf in domain:
+            if not expression.is_leaf(leaf) or tuple(leaf) in (
+                expression.TRUE_LEAF,
+                expression.FALSE_LEAF,
+            ):
+                continue
+            field_name, operator, value = leaf
+            field = model._fields.get(field_name)
+            lst_value = value if isinstance(value, (list, tuple)) else [value]
+            if (
+                not field
+                or not field.store
+                or not field.column_type
+                or operator in ("child_of", "parent_of")
+                or (
+                    field.type == "many2one"
+                    and any(isinstance(a, str) for a in lst_value)
+                )
+            ):
+                raise exceptions.Warning(
+                    _(
+                        "Domain leaf {} of model '{}' is not a comparison of"
+                        " a column, cannot filter it with PostgreSQL."
+                    ).format(leaf, model._name)
+                )
+
+    def iter_local_pages(self, model_name, lst_field, page_size, domain=None):
+        """Stream local records by page, sorted by id, with COPY."""
+        last_id = 0
+        while True:
+            lst_v = self.read_copy(
+                self.sync_db.env.cr,
+                model_name,
+                lst_field,
+                (domain or []) + [("id", ">", last_id)],
+                limit=page_size,
+            )
+            if not lst_v:
+                return
+            yield lst_v
+            if len(lst_v) < page_size:
+                return
+            last_id = lst_v[-1].get("id")
+
+    @staticmethod
+    def _get_converter(field, is_remote):
+        """Convert a value of COPY like the ORM, NULL is None."""
+        if field.type == "integer":
+            return lambda v: int(v) if v is not None else 0
+        if field.type in ("float", "monetary"):
+            return lambda v: float(v) if v is not None else 0.0
+        if field.type == "boolean":
+            return lambda v: v == "t"
+        if field.type == "many2one":
+            if is_remote:
+                return lambda v: [int(v), ""] if v is not None else False
+            return lambda v: int(v) if v is not None else False
+        if field.type == "many2many":
+            return lambda v: (
+                [int(a) for a in v.strip("{}").split(",")] if v else []
+            )
+        if field.type == "datetime":
+            # The ORM truncate to the second
+            return lambda v: v[:19] if v is not None else False
+        if field.type == "binary":
+            # bytea of base64 is written in hexadecimal
+            return lambda v: (
+                bytes.fromhex(v[2:]).decode() if v is not None else False
+            )
+        return lambda v: v if v is not None else False
+
+    def close(self):
+        self._cr.close()
@@ -1,12 +1,51 @@
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
 
 import ast
+import json
 import logging
+import time
 
 from odoo import _, api, exceptions, fields, models, tools
 
+from .sync_db_id_map import IdMap
+
 _logger = logging.getLogger(__name__)
 
+DEFAULT_RESOLUTION_BATCH_SIZE = 1000
+
+
+class ResultBuffer:
+    """Buffer values of sync.db.result and create them by batch.
+
+    A single create(vals_list) do the INSERT and the stored compute for the
+    whole batch instead of once by result.
+    """
+
+    def __init__(self, model, batch_size, run_id=False):
+        self.model = model
+        self.batch_size = batch_size
+        self.run_id = run_id
+        self.lst_vals = []
+        self.nb_created = 0
+        # Time in second creating results
+        self.time_flush = 0.0
+
+    def create(self, vals):
+        self.nb_created += 1
+        if self.run_id:
+            vals["sync_db_run_id"] = self.run_id
+        self.lst_vals.append(vals)
+        if len(self.lst_vals) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.lst_vals:
+            start = time.time()
+            lst_vals = self.lst_vals
+            self.lst_vals = []
+            self.model.create(lst_vals)
+            self.time_flush += time.time() - start
+
 
 class SyncDBResult(models.Model):
     _name = "sync.db.result"
@@ -27,14 +66,35 @@ class SyncDBResult(models.Model):
 
     record_id = fields.Integer()
 
-    field_value_local = fields.Char()
+    field_value_local = fields.Char(
+        compute="_compute_field_value",
+        help="Local values of different fields.",
+    )
 
-    field_value_remote = fields.Char()
+    field_value_remote = fields.Char(
+        compute="_compute_field_value",
+        help="Remote values of different fields.",
+    )
+
+    diff_values = fields.Text(
+        help=(
+            "JSON map of different fields of the record, to their typed"
+            " [local value, remote value]."
+        ),
+    )
 
     msg = fields.Text()
 
     data = fields.Text()
 
+    binary_field_names = fields.Char(
+        help=(
+            "Binary fields of a missing record compared by checksum, comma"
+            " separated. Their content is not kept in data, it's read by the"
+            " resolution."
+        ),
+    )
+
     sync_db_id = fields.Many2one(
         comodel_name="sync.db",
         string="Sync DB",
@@ -43,6 +103,14 @@ class SyncDBResult(models.Model):
         ondelete="cascade",
     )
 
+    sync_db_run_id = fields.Many2one(
+        comodel_name="sync.db.run",
+        string="Run",
+        index=True,
+        ondelete="cascade",
+        help="Execution which found this result.",
+    )
+
     type_result = fields.Selection(
         selection=[
             ("missing_result", "Missing result"),
@@ -52,6 +120,7 @@ class SyncDBResult(models.Model):
             ("module_wrong_version", "Module wrong version"),
             ("module_not_installed", "Module not installed"),
             ("diff_value", "Diff value"),
+            ("diff_field_type", "Diff field type"),
         ],
         help="Type of result detected.",
     )
@@ -99,6 +168,41 @@ class SyncDBResult(models.Model):
         for rec in self:
             rec.name = rec.model_name
 
+    @api.multi
+    @api.depends("diff_values")
+    def _compute_field_value(self):
+        for rec in self:
+            dct_diff = rec._get_diff_values()
+            if len(dct_diff) == 1:
+                local_value, remote_value = list(dct_diff.values())[0]
+                rec.field_value_local = str(local_value)
+                rec.field_value_remote = str(remote_value)
+            elif dct_diff:
+                rec.field_value_local = "; ".join(
+                    f"{a}: {v[0]}" for a, v in dct_diff.items()
+                )
+                rec.field_value_remote = "; ".join(
+                    f"{a}: {v[1]}" for a, v in dct_diff.items()
+                )
+            else:
+                rec.field_value_local = False
+                rec.field_value_remote = False
+
+    @api.multi
+    def _get_diff_values(self):
+        self.ensure_one()
+        return json.loads(self.diff_values) if self.diff_values else {}
+
+    @api.multi
+    def _get_data(self):
+        """Values of a missing record, stored in JSON. Results of an older
+        version are stored as a python literal."""
+        self.ensure_one()
+        try:
+            return json.loads(self.data)
+        except ValueError:
+            return ast.literal_eval(self.data)
+
     @api.multi
     @api.depends("status")
     def _compute_colored_line(self):
@@ -118,6 +222,21 @@ class SyncDBResult(models.Model):
 
     @api.multi
     def sync_local(self):
+        """Apply resolutions on local, grouped by model and record.
+
+        Missing records are created by chunk, all different fields of a
+        record are written together. With deferred recompute, stored
+        computed fields are recomputed once at the end.
+        """
+        if not self:
+            return
+        sync_db = self[0].sync_db_id
+        batch_size = (
+            sync_db.resolution_batch_size or DEFAULT_RESOLUTION_BATCH_SIZE
+        )
+        solved = self.env["sync.db.result"]
+        dct_record_vals = {}
+        dct_create = {}
         for rec in self:
             if rec.resolution not in [
                 "solution_local",
@@ -125,30 +244,148 @@ class SyncDBResult(models.Model):
             ]:
                 continue
             if rec.type_result == "missing_result":
-                rec.status = "solved"
-                self.env[rec.model_name].create(ast.literal_eval(rec.data))
+                solved |= rec
+                dct_create.setdefault(rec.model_name, []).append(rec)
             elif rec.type_result == "diff_value":
-                rec.status = "solved"
-                setattr(
-                    self.env[rec.model_name].browse(rec.record_id),
-                    rec.field_name,
-                    rec.field_value_remote,
-                )
+                solved |= rec
+                dct_record_vals.setdefault(
+                    (rec.model_name, rec.record_id), {}
+                ).update(rec._get_diff_write_vals(1))
             else:
                 raise exceptions.Warning(
                     _(f"Cannot support type_result '{rec.type_result}'.")
                 )
 
+        id_map = IdMap(self.env, sync_db.id)
+        if sync_db.defer_recompute:
+            with self.env.norecompute():
+                self._apply_local(
+                    dct_create, dct_record_vals, batch_size, id_map
+                )
+            self.recompute()
+        else:
+            self._apply_local(dct_create, dct_record_vals, batch_size, id_map)
+        # (model_name, local_id, remote_id, field_name) of binaries to copy
+        lst_binary = [
+            (
+                rec.model_name,
+                rec.record_id,
+                id_map.to_remote(rec.model_name, rec.record_id),
+                field_name,
+            )
+            for rec in solved
+            if rec.type_result == "diff_value"
+            for field_name in rec._get_diff_binary_fields()
+        ] + [
+            (
+                model_name,
+                id_map.to_local(model_name, result.record_id),
+                result.record_id,
+                field_name,
+            )
+            for model_name, lst_result in dct_create.items()
+            for result in lst_result
+            for field_name in result._get_missing_binary_fields()
+        ]
+        if lst_binary:
+            self._copy_remote_binaries(sync_db, lst_binary)
+        solved.write({"status": "solved"})
+
+    @api.model
+    def _copy_remote_binaries(self, sync_db, lst_binary):
+        """Write binaries read from remote, their content is read only now,
+        by chunk of a batch of records for each field."""
+        dct_field = {}
+        for model_name, local_id, remote_id, field_name in lst_binary:
+            dct_field.setdefault((model_name, field_name), []).append(
+                (local_id, remote_id)
+            )
+        SyncDB = self.env["sync.db"]
+        with sync_db._remote_connection(sync_db) as odoo:
+            for (model_name, field_name), lst_id in dct_field.items():
+                dct_value = SyncDB._read_remote_binaries(
+                    odoo, model_name, field_name, [b for a, b in lst_id]
+                )
+                for local_id, remote_id in lst_id:
+                    self.env[model_name].browse(local_id).write(
+                        {field_name: dct_value.get(remote_id, False)}
+                    )
+
+    @api.model
+    def _apply_local(self, dct_create, dct_record_vals, batch_size, id_map):
+        # Create first, written values can refer to created records
+        for model_name, lst_result in dct_create.items():
+            model = self.env[model_name]
+            for i in range(0, len(lst_result), batch_size):
+                lst_chunk = lst_result[i : i + batch_size]
+                new_records = model.create(
+                    [
+                        id_map.translate_vals(
+                            model,
+                            result._get_data(),
+                            to_remote=False,
+                        )
+                        for result in lst_chunk
+                    ]
+                )
+                id_map.add_many(
+                    model_name,
+                    [
+                        (new_record.id, result.record_id)
+                        for new_record, result in zip(new_records, lst_chunk)
+                    ],
+                )
+
+        for model_name, record_id in dct_record_vals:
+            id_map.translate_vals(
+                self.env[model_name],
+                dct_record_vals[(model_name, record_id)],
+                to_remote=False,
+            )
+        for model_name, vals, lst_record_id in self._group_by_vals(
+            dct_record_vals
+        ):
+            for i in range(0, len(lst_record_id), batch_size):
+                self.env[model_name].browse(
+                    lst_record_id[i : i + batch_size]
+                ).write(vals)
+
+    @api.model
+    def _group_by_vals(self, dct_record_vals):
+        """Return [(model_name, vals, [record_id])] from values by
+        (model_name, record_id), records with the same values together."""
+        dct_group = {}
+        for (model_name, record_id), vals in dct_record_vals.items():
+            key = (model_name, repr(sorted(vals.items())))
+            dct_group.setdefault(key, (model_name, vals, []))[2].append(
+                record_id
+            )
+        return list(dct_group.values())
+
     @api.multi
     def sync_remote(self):
-        odoo = None
-        if self and self[0]:
-            odoo = self[0].sync_db_id.get_odoo(self[0].sync_db_id)
-        if not odoo:
+        if not self:
             raise exceptions.Warning(
                 _(f"Cannot support get connexion to remote.")
             )
+        sync_db = self[0].sync_db_id
+        with sync_db._remote_connection(sync_db) as odoo:
+            self._sync_remote(odoo)
+
+    def _sync_remote(self, odoo):
+        """Apply resolutions on remote, grouped by model and record.
 
+        All different fields of a record are written together, records
+        with the same values share the write, and missing records are
+        created by chunk.
+        """
+        batch_size = (
+            self[0].sync_db_id.resolution_batch_size
+            or DEFAULT_RESOLUTION_BATCH_SIZE
+        )
+        solved = self.env["sync.db.result"]
+        dct_record_vals = {}
+        dct_create = {}
         for rec in self:
             if rec.resolution not in [
                 "solution_remote",
@@ -157,21 +394,8 @@ class SyncDBResult(models.Model):
                 continue
 
             if rec.type_result == "missing_result":
-                rec.status = "solved"
-                create_id = -1
-                while create_id < rec.record_id:
-                    data = ast.literal_eval(rec.data)
-                    try:
-                        create_id = odoo.env[rec.model_name].create(data)
-                    except Exception as e:
-                        raise e
-                    if create_id < rec.record_id:
-                        # unlink and create until same id
-                        _logger.debug(
-                            f"Unlink and recreate {create_id} to"
-                            f" {rec.record_id}"
-                        )
-                        odoo.env[rec.model_name].unlink(create_id)
+                solved |= rec
+                dct_create.setdefault(rec.model_name, []).append(rec)
             elif rec.type_result == "module_not_installed":
                 Module = odoo.env["ir.module.module"]
                 module_id = Module.search([("name", "=", rec.data)])
@@ -190,19 +414,137 @@ class SyncDBResult(models.Model):
                         )
                 rec.status = "solved"
             elif rec.type_result == "diff_value":
-                field_type = (
-                    self.env[rec.model_name]._fields.get(rec.field_name).type
-                )
-                rec.status = "solved"
-                v = rec.field_value_local
-                if field_type in ("many2many", "one2many"):
-                    v = ast.literal_eval(v)
-                setattr(
-                    odoo.env[rec.model_name].browse(rec.record_id),
-                    rec.field_name,
-                    v,
-                )
+                solved |= rec
+                dct_record_vals.setdefault(
+                    (rec.model_name, rec.record_id), {}
+                ).update(rec._get_diff_write_vals(0))
             else:
                 raise exceptions.Warning(
                     _(f"Cannot support type_result '{rec.type_result}'.")
                 )
+
+        # Create first, written values can refer to created records
+        id_map = IdMap(self.env, self[0].sync_db_id.id)
+        for model_name, lst_result in dct_create.items():
+            self._create_remote(
+                odoo, model_name, lst_result, batch_size, id_map
+            )
+
+        # Records with the same values are written together
+        dct_remote_vals = {
+            (model_name, id_map.to_remote(model_name, record_id)): (
+                id_map.translate_vals(self.env[model_name], vals)
+            )
+            for (model_name, record_id), vals in dct_record_vals.items()
+        }
+        for model_name, vals, lst_record_id in self._group_by_vals(
+            dct_remote_vals
+        ):
+            for i in range(0, len(lst_record_id), batch_size):
+                odoo.execute_kw(
+                    model_name,
+                    "write",
+                    [lst_record_id[i : i + batch_size], vals],
+                )
+
+        # Binaries are read only now, by batch, records with the same values
+        # share the write
+        dct_binary = {}
+        for rec in solved:
+            if rec.type_result == "diff_value":
+                lst_field_name = rec._get_diff_binary_fields()
+            else:
+                lst_field_name = rec._get_missing_binary_fields()
+            if lst_field_name:
+                dct_binary.setdefault(
+                    (rec.model_name, tuple(sorted(lst_field_name))), set()
+                ).add(rec.record_id)
+        for (model_name, lst_field_name), set_id in dct_binary.items():
+            model = self.env[model_name].with_context(bin_size=False)
+            lst_id = sorted(set_id)
+            for i in range(0, len(lst_id), batch_size):
+                dct_record_vals = {}
+                for dct_value in model.browse(lst_id[i : i + batch_size]).read(
+                    list(lst_field_name)
+                ):
+                    remote_id = id_map.to_remote(model_name, dct_value["id"])
+                    dct_record_vals[(model_name, remote_id)] = {
+                        field_name: (
+                            dct_value[field_name].decode()
+                            if type(dct_value[field_name]) is bytes
+                            else dct_value[field_name]
+                        )
+                        for field_name in lst_field_name
+                    }
+                for _model_name, vals, lst_record_id in self._group_by_vals(
+                    dct_record_vals
+                ):
+                    odoo.execute_kw(model_name, "write", [lst_record_id, vals])
+        solved.write({"status": "solved"})
+
+    @api.multi
+    def _get_diff_write_vals(self, side):
+        """Values to write from the map of different fields, side 0 is the
+        local value and 1 the remote value. Binaries are compared by
+        checksum, they are written apart."""
+        self.ensure_one()
+        model_fields = self.env[self.model_name]._fields
+        return {
+            field_name: self._get_write_value(
+                model_fields.get(field_name).type, values[side]
+            )
+            for field_name, values in self._get_diff_values().items()
+            if model_fields.get(field_name).type != "binary"
+        }
+
+    @api.multi
+    def _get_diff_binary_fields(self):
+        self.ensure_one()
+        model_fields = self.env[self.model_name]._fields
+        return [
+            field_name
+            for field_name in self._get_diff_values()
+            if model_fields.get(field_name).type == "binary"
+        ]
+
+    @api.multi
+    def _get_missing_binary_fields(self):
+        self.ensure_one()
+        if not self.binary_field_names:
+            return []
+        return self.binary_field_names.split(",")
+
+    @api.model
+    def _get_write_value(self, field_type, value):
+        """Convert a typed value of diff_values to write it."""
+        if field_type == "many2one":
+            # Remote value is read as [id, name]
+            return value[0] if type(value) is list else value
+        if field_type in ("many2many", "one2many"):
+            return [(6, 0, value or [])]
+        return value
+
+    @api.model
+    def _create_remote(self, odoo, model_name, lst_result, batch_size, id_map):
+        """Create missing records on remote by chunk, and map the local id
+        to the created id."""
+        model = self.env[model_name]
+        for i in range(0, len(lst_result), batch_size):
+            lst_chunk = lst_result[i : i + batch_size]
+            lst_create_id = odoo.execute_kw(
+                model_name,
+                "create",
+                [
+                    [
+                        id_map.translate_vals(model, result._get_data())
+                        for result in lst_chunk
+                    ]
+                ],
+            )
+            id_map.add_many(
+                model_name,
+                [
+                    (result.record_id, create_id)
+                    for result, create_id in zip(lst_chunk, lst_create_id)
+                ],
+            )
@@ -0,0 +1,356 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+import json
+import logging
+import time
+from datetime import timedelta
+
+from odoo import _, api, fields, models
+
+from .sync_db_run_stat import STAT_FIELDS
+
+_logger = logging.getLogger(__name__)
+
+# A running run without checkpoint for this delay is dead, like a worker
+# killed by its time limit or a restart
+RUN_STALE_DELAY = timedelta(hours=1)
+
+
+class SyncCancelled(Exception):
+    """Raised in a running sync when its cancel is requested."""
+
+
+class RunProgress:
+    """Publish progress of a sync.db.run running in background.
+
+    At each checkpoint, the work of the sync is committed, and the progress
+    is written with its own short transaction, so it's visible right away
+    and a cancel requested by the user never conflict with the sync.
+    """
+
+    def __init__(self, run, models_total, interval=5):
+        self.run_id = run.id
+        self.env = run.env
+        self.models_total = models_total
+        self.interval = interval
+        self.models_done = 0
+        self.records_compared = 0
+        self.diffs_found = 0
+        self.start_time = time.time()
+        self.last_update = 0
+
+    def checkpoint(
+        self, result_buffer, nb_record=0, nb_model=0, nb_result=0, force=False
+    ):
+        self.models_done += nb_model
+        self.records_compared += nb_record
+        self.diffs_found += nb_result
+        if not force and time.time() - self.last_update < self.interval:
+            return
+        self.last_update = time.time()
+        result_buffer.flush()
+        self.env.cr.commit()
+        vals = {
+            "models_total": self.models_total,
+            "models_done": self.models_done,
+            "records_compared": self.records_compared,
+            "diffs_found": self.diffs_found + result_buffer.nb_created,
+            "date_eta": False,
+            "date_checkpoint": fields.Datetime.now(),
+        }
+        if self.models_done:
+            duration = time.time() - self.start_time
+            remaining = (
+                duration
+                / self.models_done
+                * (self.models_total - self.models_done)
+            )
+            vals["date_eta"] = fields.Datetime.now() + timedelta(
+                seconds=remaining
+            )
+        with api.Environment.manage(), self.env.registry.cursor() as cr:
+            env = api.Environment(cr, self.env.uid, self.env.context)
+            run = env["sync.db.run"].browse(self.run_id)
+            run.write(vals)
+            if run.is_cancel_requested:
+                raise SyncCancelled()
+
+
+class SyncDBRun(models.Model):
+    _name = "sync.db.run"
+    _description = "Sync db execution"
+    _order = "id desc"
+
+    name = fields.Char(
+        compute="_compute_name",
+        store=True,
+    )
+
+    sync_db_id = fields.Many2one(
+        comodel_name="sync.db",
+        string="Sync DB",
+        required=True,
+        index=True,
+        ondelete="cascade",
+    )
+
+    state = fields.Selection(
+        selection=[
+            ("queued", "Queued"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("cancel", "Cancelled"),
+            ("failed", "Failed"),
+        ],
+        default="queued",
+        required=True,
+    )
+
+    in_background = fields.Boolean(
+        help="Run by the scheduled action, not in the request.",
+    )
+
+    sync_db_fleet_id = fields.Many2one(
+        comodel_name="sync.db.fleet",
+        string="Fleet",
+        index=True,
+        ondelete="set null",
+        help="Fleet comparison which started this run.",
+    )
+
+    is_cancel_requested = fields.Boolean(
+        help="The running sync stop at its next checkpoint.",
+    )
+
+    start_date = fields.Datetime()
+
+    stop_date = fields.Datetime()
+
+    time_duration = fields.Float(
+        compute="_compute_time_duration",
+        store=True,
+        help="Time in second, duration of execution",
+    )
+
+    models_total = fields.Integer()
+
+    models_done = fields.Integer()
+
+    records_compared = fields.Integer()
+
+    diffs_found = fields.Integer()
+
+    date_checkpoint = fields.Datetime(
+        string="Last checkpoint",
+        help="Last progress published by a run in background.",
+    )
+
+    date_eta = fields.Datetime(
+        string="ETA",
+        help="Estimated end of execution, based on compared models.",
+    )
+
+    progress = fields.Float(
+        compute="_compute_progress",
+        help="Percentage of compared models.",
+    )
+
+    msg = fields.Text()
+
+    sync_db_result_ids = fields.One2many(
+        comodel_name="sync.db.result",
+        inverse_name="sync_db_run_id",
+        string="Results",
+    )
+
+    result_count = fields.Integer(
+        compute="_compute_result_count",
+    )
+
+    sync_db_run_stat_ids = fields.One2many(
+        comodel_name="sync.db.run.stat",
+        inverse_name="sync_db_run_id",
+        string="Measures",
+        help="Time, requests and queries by model.",
+    )
+
+    @api.multi
+    @api.depends("sync_db_id", "start_date")
+    def _compute_name(self):
+        for rec in self:
+            rec.name = f"{rec.sync_db_id.name} {rec.start_date or ''}"
+
+    @api.multi
+    @api.depends("start_date", "stop_date")
+    def _compute_time_duration(self):
+        for rec in self:
+            if rec.start_date and rec.stop_date:
+                rec.time_duration = (
+                    rec.stop_date - rec.start_date
+                ).total_seconds()
+            else:
+                rec.time_duration = False
+
+    @api.multi
+    @api.depends("models_done", "models_total")
+    def _compute_progress(self):
+        for rec in self:
+            if rec.models_total:
+                rec.progress = 100.0 * rec.models_done / rec.models_total
+            else:
+                rec.progress = 0.0
+
+    @api.multi
+    def _compute_result_count(self):
+        dct_count = {
+            a["sync_db_run_id"][0]: a["sync_db_run_id_count"]
+            for a in self.env["sync.db.result"].read_group(
+                [("sync_db_run_id", "in", self.ids)],
+                ["sync_db_run_id"],
+                ["sync_db_run_id"],
+            )
+        }
+        for rec in self:
+            rec.result_count = dct_count.get(rec.id, 0)
+
+    @api.multi
+    def action_show_result(self):
+        self.ensure_one()
+        action = self.env.ref(
+            "sync_external_model.action_sync_db_result"
+        ).read()[0]
+        action["domain"] = [("sync_db_run_id", "=", self.id)]
+        action["context"] = {"default_sync_db_id": self.sync_db_id.id}
+        return action
+
+    @api.multi
+    def _log_stat(self):
+        """Log the total of measures of the run as a JSON line."""
+        for rec in self:
+            dct_total = dict.fromkeys(STAT_FIELDS, 0)
+            for a in self.env["sync.db.run.stat"].search_read(
+                [("sync_db_run_id", "=", rec.id)], STAT_FIELDS
+            ):
+                for key in STAT_FIELDS:
+                    dct_total[key] += a.get(key)
+            if rec.start_date:
+                # Total of the run is its duration, models run in parallel
+                dct_total["time_total"] = (
+                    fields.Datetime.now() - rec.start_date
+                ).total_seconds()
+            dct_total.update(
+                {"sync_db_run_id": rec.id, "sync_db_id": rec.sync_db_id.id}
+            )
+            _logger.info(f"Sync run stat {json.dumps(dct_total)}")
+
+    @api.multi
+    def action_cancel(self):
+        """Cancel a queued run, or request the cancel of a running run read
+        at its next checkpoint. A running run without live checkpoint is
+        cancelled right away, nothing would read the request."""
+        for rec in self:
+            if rec.state == "queued":
+                rec.state = "cancel"
+            elif rec.state == "running":
+                if rec.in_background and not rec._is_stale():
+                    rec.is_cancel_requested = True
+                else:
+                    rec.write(
+                        {"state": "cancel", "stop_date": fields.Datetime.now()}
+                    )
+
+    @api.multi
+    def _is_stale(self):
+        self.ensure_one()
+        return (
+            self.date_checkpoint or self.start_date or fields.Datetime.now()
+        ) < fields.Datetime.now() - RUN_STALE_DELAY
+
+    @api.model
+    def _fail_stale_runs(self):
+        """Fail running runs without checkpoint since RUN_STALE_DELAY, their
+        execution died without updating them."""
+        date_limit = fields.Datetime.now() - RUN_STALE_DELAY
+        runs = self.search(
+            [
+                ("state", "=", "running"),
+                "|",
+                ("date_checkpoint", "<", date_limit),
+                "&",
+                ("date_checkpoint", "=", False),
+                ("start_date", "<", date_limit),
+            ]
+        )
+        for run in runs:
+            _logger.warning(f"Sync run {run.id} is stale, set as failed")
+        runs.write(
+            {
+                "state": "failed",
+                "stop_date": fields.Datetime.now(),
+                "msg": _("Execution stopped without ending its run."),
+            }
+        )
+
+    @api.model
+    def run_queued(self):
+        """Execute queued runs, called by the scheduled action. Runs of a
+        fleet are executed together, they share local records. Dead runs are
+        failed first."""
+        self._fail_stale_runs()
+        self.env.cr.commit()
+        runs = self.search([("state", "=", "queued")], order="id")
+        for fleet in runs.mapped("sync_db_fleet_id"):
+            fleet._execute_runs(
+                runs.filtered(lambda r: r.sync_db_fleet_id == fleet)
+            )
+        for run in runs.filtered(lambda r: not r.sync_db_fleet_id):
+            run._execute()
+
+    @api.multi
+    def _execute(self):
+        """Execute the sync of this run.
+
+        In background, the work is committed by chunk, a cancel or an error
+        is kept on the run instead of raised. In the request, a failed run
+        is committed before raising the error, the work could be committed
+        by parallel workers.
+        """
+        self.ensure_one()
+        self.write({"state": "running", "start_date": fields.Datetime.now()})
+        if not self.in_background:
+            try:
+                self.sync_db_id._sync(self, None)
+            except Exception as e:
+                self.env.cr.rollback()
+                self.invalidate_cache()
+                # Without parallel workers, the run is rolled back too
+                if self.exists():
+                    self.write(
+                        {
+                            "state": "failed",
+                            "msg": str(e),
+                            "stop_date": fields.Datetime.now(),
+                        }
+                    )
+                    self.env.cr.commit()
+                raise
+            self.write({"state": "done", "stop_date": fields.Datetime.now()})
+            return
+        self.env.cr.commit()
+        try:
+            self.sync_db_id._sync(self, RunProgress(self, 0))
+        except SyncCancelled:
+            self.env.cr.rollback()
+            vals = {"state": "cancel"}
+        except Exception as e:
+            self.env.cr.rollback()
+            _logger.exception(f"Sync run {self.id} failed")
+            vals = {"state": "failed", "msg": str(e)}
+        else:
+            # New transaction, the run can be changed by the user meanwhile
+            self.env.cr.commit()
+            vals = {"state": "done"}
+        self.invalidate_cache()
+        vals["stop_date"] = fields.Datetime.now()
+        self.write(vals)
+        self.env.cr.commit()
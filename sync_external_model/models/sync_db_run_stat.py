@@ -0,0 +1,220 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+STAT_FIELDS = [
+    "time_total",
+    "time_remote",
+    "time_local_read",
+    "time_compare",
+    "time_result_write",
+    "rpc_count",
+    "bytes_sent",
+    "bytes_received",
+    "sql_count",
+    "record_count",
+    "result_count",
+]
+
+
+class SyncStat:
+    """Measure a phase of a sync, saved in a sync.db.run.stat.
+
+    Time not spent on remote, in local reads or in result writes is the
+    comparison.
+    """
+
+    def __init__(self, cr, result_buffer):
+        self.cr = cr
+        self.result_buffer = result_buffer
+        self.start_time = time.time()
+        self.sql_count_start = cr.sql_log_count
+        self.time_flush_start = result_buffer.time_flush
+        self.dct_value = dict.fromkeys(STAT_FIELDS, 0)
+
+    @contextmanager
+    def measure(self, key):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.dct_value[key] += time.time() - start
+
+    def iter_measured(self, iterable, key):
+        """Yield items of iterable, time to get them is added to key."""
+        iterator = iter(iterable)
+        while True:
+            with self.measure(key):
+                item = next(iterator, None)
+            if item is None:
+                return
+            yield item
+
+    def get_vals(self):
+        vals = dict(self.dct_value)
+        vals["time_total"] = time.time() - self.start_time
+        vals["time_result_write"] = (
+            self.result_buffer.time_flush - self.time_flush_start
+        )
+        vals["sql_count"] = self.cr.sql_log_count - self.sql_count_start
+        vals["time_compare"] = max(
+            vals["time_total"]
+            - vals["time_remote"]
+            - vals["time_local_read"]
+            - vals["time_result_write"],
+            0,
+        )
+        return vals
+
+
+class TransportCounter:
+    """Wrap the urllib opener of odoorpc, count bytes of requests and
+    responses on the wire."""
+
+    def __init__(self, opener):
+        self.opener = opener
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def open(self, request, *args, **kwargs):
+        self.bytes_sent += len(request.data or b"")
+        response = self.opener.open(request, *args, **kwargs)
+        self.bytes_received += int(response.headers.get("Content-Length") or 0)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.opener, name)
+
+
+def _get_json_proxy(odoo):
+    connector = getattr(odoo, "_connector", None)
+    return getattr(connector, "proxy_json", None)
+
+
+def get_transport_bytes(odoo):
+    """Return (bytes sent, bytes received) counted by the transport of a
+    connection, None when it doesn't count them."""
+    if hasattr(odoo, "bytes_sent"):
+        # Stand-ins counting their requests, like the benchmark
+        return odoo.bytes_sent, odoo.bytes_received
+    opener = getattr(_get_json_proxy(odoo), "_opener", None)
+    if isinstance(opener, TransportCounter):
+        return opener.bytes_sent, opener.bytes_received
+    return None
+
+
+class RemoteMeter:
+    """Wrap a connection to remote, count its requests, their time and the
+    bytes sent and received by the transport.
+
+    The opener of an odoorpc connection is wrapped once to count bytes, it
+    stays wrapped in the cache of connections. A snapshot or a database
+    read with PostgreSQL doesn't count bytes.
+    """
+
+    def __init__(self, odoo, stat):
+        self.odoo = odoo
+        self.stat = stat
+        proxy = _get_json_proxy(odoo)
+        opener = getattr(proxy, "_opener", None)
+        if opener is not None and not isinstance(opener, TransportCounter):
+            proxy._opener = TransportCounter(opener)
+
+    def execute_kw(self, model_name, method, args, kwargs=None):
+        transport_start = get_transport_bytes(self.odoo)
+        with self.stat.measure("time_remote"):
+            result = self.odoo.execute_kw(model_name, method, args, kwargs)
+        dct_value = self.stat.dct_value
+        dct_value["rpc_count"] += 1
+        if transport_start:
+            bytes_sent, bytes_received = get_transport_bytes(self.odoo)
+            dct_value["bytes_sent"] += bytes_sent - transport_start[0]
+            dct_value["bytes_received"] += bytes_received - transport_start[1]
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self.odoo, name)
+
+
+class SyncDBRunStat(models.Model):
+    _name = "sync.db.run.stat"
+    _description = "Sync db execution measures by model"
+    _order = "sync_db_run_id desc, id"
+
+    sync_db_run_id = fields.Many2one(
+        comodel_name="sync.db.run",
+        string="Execution",
+        required=True,
+        index=True,
+        ondelete="cascade",
+    )
+
+    model_name = fields.Char(
+        help="Empty for the validation of modules and schema.",
+    )
+
+    time_total = fields.Float(
+        help="Time in second of the model.",
+    )
+
+    time_remote = fields.Float(
+        help="Time in second of requests to remote, read and network.",
+    )
+
+    time_local_read = fields.Float(
+        help="Time in second reading local records.",
+    )
+
+    time_compare = fields.Float(
+        help="Time in second comparing, the remaining time of the model.",
+    )
+
+    time_result_write = fields.Float(
+        help="Time in second creating results.",
+    )
+
+    rpc_count = fields.Integer(
+        string="RPC count",
+    )
+
+    # Float, an integer overflow above 2 GiB
+    bytes_sent = fields.Float(
+        digits=(16, 0),
+        help="Size of requests to remote counted by the transport.",
+    )
+
+    bytes_received = fields.Float(
+        digits=(16, 0),
+        help="Size of responses of remote counted by the transport.",
+    )
+
+    sql_count = fields.Integer(
+        string="SQL count",
+        help="Number of local SQL queries.",
+    )
+
+    record_count = fields.Integer(
+        help="Number of compared records.",
+    )
+
+    result_count = fields.Integer(
+        help="Number of created results.",
+    )
+
+    @api.model
+    def create_from_stat(self, run_id, model_name, stat, vals=None):
+        """Save measures of a stat, also logged as a JSON line."""
+        dct_vals = stat.get_vals()
+        dct_vals.update(vals or {})
+        dct_vals.update(
+            {"sync_db_run_id": run_id, "model_name": model_name or False}
+        )
+        _logger.info(f"Sync stat {json.dumps(dct_vals)}")
+        return self.create(dct_vals)
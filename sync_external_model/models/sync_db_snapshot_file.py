@@ -0,0 +1,395 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+import gzip
+import json
+import os
+import threading
+import zlib
+
+from odoo import SUPERUSER_ID, _, exceptions, tools
+
+# Format of snapshot lines, increment on incompatible change
+SNAPSHOT_FORMAT_VERSION = 2
+
+# Size of compressed data read at once while indexing a snapshot
+INDEX_READ_SIZE = 1024 * 1024
+
+# Index of snapshot files by (path, size, mtime), shared by workers
+_INDEX_CACHE = {}
+_INDEX_LOCK = threading.Lock()
+
+
+def get_snapshot_dir():
+    """Directory of snapshot files written by this server."""
+    return os.path.realpath(
+        os.path.join(tools.config["data_dir"], "sync_db_snapshot")
+    )
+
+
+def get_snapshot_path(file_name):
+    """Return the path of a snapshot file to write, it must be in the
+    snapshot directory."""
+    snapshot_dir = get_snapshot_dir()
+    path = os.path.realpath(os.path.join(snapshot_dir, file_name))
+    if os.path.dirname(path) != snapshot_dir:
+        raise exceptions.AccessError(
+            _("Snapshot {} must be a file of directory {}.").format(
+                file_name, snapshot_dir
+            )
+        )
+    return path
+
+
+def _json_default(value):
+    # Binary are read as base64 bytes, like RPC return them as string
+    if isinstance(value, bytes):
+        return value.decode("ascii")
+    return str(value)
+
+
+def write_snapshot_line(f, kind, value):
+    """Write a line [kind, value] of a snapshot.
+
+    Kinds are header, model, xml_id and record. Values are serialized like
+    a JSON-RPC response. The header and each model with its external ids
+    and records are written in their own gzip member.
+    """
+    f.write(json.dumps([kind, value], default=_json_default).encode())
+    f.write(b"\n")
+
+
+def _get_leaf_value(item, field_name):
+    value = item[field_name]
+    if isinstance(value, list):
+        # Many2one is [id, name]
+        return value[0] if value else False
+    return value
+
+
+def _match_leaf(item, leaf):
+    field_name, operator, value = leaf
+    if field_name not in item:
+        raise exceptions.Warning(
+            _(
+                "Field '{}' is not in the snapshot, cannot filter on it."
+            ).format(field_name)
+        )
+    item_value = _get_leaf_value(item, field_name)
+    if operator == "=":
+        return item_value == value
+    if operator == "!=":
+        return item_value != value
+    if operator == "in":
+        return item_value in value
+    if operator == "not in":
+        return item_value not in value
+    if item_value is False or item_value is None:
+        return False
+    if operator == ">":
+        return item_value > value
+    if operator == ">=":
+        return item_value >= value
+    if operator == "<":
+        return item_value < value
+    if operator == "<=":
+        return item_value <= value
+    raise exceptions.Warning(
+        _("Operator '{}' is not supported on a snapshot.").format(operator)
+    )
+
+
+def match_domain(item, domain):
+    """Evaluate a domain in prefix notation on a dict of values."""
+    lst_stack = []
+    for token in reversed(domain):
+        if token == "!":
+            lst_stack.append(not lst_stack.pop())
+        elif token == "&":
+            lst_stack.append(lst_stack.pop() & lst_stack.pop())
+        elif token == "|":
+            lst_stack.append(lst_stack.pop() | lst_stack.pop())
+        else:
+            lst_stack.append(_match_leaf(item, token))
+    return all(lst_stack)
+
+
+def is_domain_complete(domain):
+    """Return True when all operators of a domain have their operands, the
+    domain can then be combined with another leaf."""
+    nb_operand = 0
+    for token in reversed(domain):
+        if token == "!":
+            if nb_operand < 1:
+                return False
+        elif token in ("&", "|"):
+            if nb_operand < 2:
+                return False
+            nb_operand -= 1
+        else:
+            nb_operand += 1
+    return True
+
+
+def get_id_range(domain):
+    """Return (id_min, id_max) of records matching a domain from its leaves
+    on id combined with the others by and, id_max is None without maximum.
+    """
+    id_min = 0
+    id_max = None
+    for i, leaf in enumerate(domain):
+        if not (
+            isinstance(leaf, (list, tuple))
+            and leaf[0] == "id"
+            and is_domain_complete(domain[:i])
+            and is_domain_complete(domain[i + 1 :])
+        ):
+            continue
+        operator, value = leaf[1], leaf[2]
+        if operator == "in":
+            lst_id = [a for a in value if isinstance(a, int)]
+            if not lst_id:
+                # No record
+                return 1, 0
+            leaf_min, leaf_max = min(lst_id), max(lst_id)
+        elif operator == "=":
+            leaf_min, leaf_max = value, value
+        elif operator == ">":
+            leaf_min, leaf_max = value + 1, None
+        elif operator == ">=":
+            leaf_min, leaf_max = value, None
+        elif operator == "<":
+            leaf_min, leaf_max = 0, value - 1
+        elif operator == "<=":
+            leaf_min, leaf_max = 0, value
+        else:
+            continue
+        id_min = max(id_min, leaf_min)
+        if leaf_max is not None:
+            id_max = leaf_max if id_max is None else min(id_max, leaf_max)
+    return id_min, id_max
+
+
+class SnapshotFileOdoo:
+    """Stand-in of odoorpc.ODOO reading a snapshot file instead of a remote.
+
+    The file is a gzip of JSON lines written by sync.db
+    _dump_sync_snapshot. It's read once to index the position of the gzip
+    member of each model, and then records of a model are streamed from its
+    position, without decompressing the models before. The stream of a
+    model is kept between requests, a request for greater ids, like the
+    next page of an id cursor or the next chunk of ids, continue it instead
+    of reading the file again. Memory never depend on the size of the
+    file. The snapshot is read-only, a resolution on remote is refused.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dct_stream = {}
+        self.header, self.dct_model = self._get_index(path)
+        self.version = self.header.get("odoo_version")
+
+    @staticmethod
+    def _get_index(path):
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime)
+        with _INDEX_LOCK:
+            if key not in _INDEX_CACHE:
+                # Only the last version of a file is kept
+                for old_key in [a for a in _INDEX_CACHE if a[0] == path]:
+                    del _INDEX_CACHE[old_key]
+                _INDEX_CACHE[key] = SnapshotFileOdoo._read_index(path)
+            return _INDEX_CACHE[key]
+
+    @staticmethod
+    def _read_index(path):
+        header = {}
+        dct_model = {}
+        for offset, line in SnapshotFileOdoo._iter_members(path):
+            kind, value = json.loads(line)
+            if kind == "header":
+                header = value
+            elif kind == "model":
+                dct_model[value.get("model")] = dict(value, offset=offset)
+        if header.get("version") != SNAPSHOT_FORMAT_VERSION:
+            raise exceptions.Warning(
+                _("File {} is not a snapshot of version {}.").format(
+                    path, SNAPSHOT_FORMAT_VERSION
+                )
+            )
+        return header, dct_model
+
+    @staticmethod
+    def _iter_members(path):
+        """Yield (offset, first line) of each gzip member of a file, the
+        offset is in the compressed file. Members are decompressed once,
+        without keeping their data."""
+        with open(path, "rb") as f:
+            data = b""
+            while True:
+                data = data or f.read(INDEX_READ_SIZE)
+                if not data:
+                    return
+                offset = f.tell() - len(data)
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                first_line = b""
+                while not decompressor.eof:
+                    if not data:
+                        data = f.read(INDEX_READ_SIZE)
+                        if not data:
+                            raise exceptions.Warning(
+                                _("Snapshot {} is truncated.").format(path)
+                            )
+                    value = decompressor.decompress(data, INDEX_READ_SIZE)
+                    data = decompressor.unconsumed_tail
+                    if b"\n" not in first_line:
+                        first_line += value
+                data = decompressor.unused_data
+                yield offset, first_line.split(b"\n", 1)[0]
+
+    def login(self, db, login, password):
+        return True
+
+    def json(self, url, params):
+        return {"result": {"uid": SUPERUSER_ID}}
+
+    def execute_kw(self, model_name, method, args, kwargs=None):
+        kwargs = kwargs or {}
+        with self._lock:
+            if model_name == "sync.db":
+                return self._execute_sync_db(method, args)
+            if method not in ("search_read", "search"):
+                raise exceptions.Warning(
+                    _("Snapshot {} is read-only, cannot {} on {}.").format(
+                        self.path, method, model_name
+                    )
+                )
+            domain = args[0] if args else []
+            if model_name == "ir.module.module":
+                lst_v = self.header.get("modules", [])
+            elif model_name == "ir.model":
+                lst_v = [{"model": a} for a in self.dct_model]
+            elif model_name == "ir.model.fields":
+                lst_v = [
+                    field
+                    for value in self.dct_model.values()
+                    for field in value.get("fields")
+                ]
+            elif model_name == "ir.model.data":
+                lst_v = self._iter_xml_id(domain)
+            elif model_name in self.dct_model:
+                return self._search_record(model_name, method, domain, kwargs)
+            else:
+                raise exceptions.Warning(
+                    _("Model {} is not in snapshot {}.").format(
+                        model_name, self.path
+                    )
+                )
+            lst_v = [a for a in lst_v if match_domain(a, domain)]
+            if method == "search":
+                return [a.get("id") for a in lst_v]
+            return lst_v
+
+    def _execute_sync_db(self, method, args):
+        if method == "get_sync_model_fingerprint":
+            value = self.dct_model.get(args[0])
+            if value:
+                return value.get("fingerprint")
+        # Hashes and binary checksums are not dumped, compare values
+        raise exceptions.Warning(
+            _("Method {} is not available on a snapshot.").format(method)
+        )
+
+    def _iter_section(self, model_name, kind):
+        """Stream values of lines of a kind for a model."""
+        with open(self.path, "rb") as raw:
+            raw.seek(self.dct_model[model_name].get("offset"))
+            f = gzip.GzipFile(fileobj=raw, mode="rb")
+            # The member starts with the line of the model
+            f.readline()
+            for line in iter(f.readline, b""):
+                line_kind, value = json.loads(line)
+                if line_kind == "model":
+                    return
+                if line_kind == kind:
+                    yield value
+                elif kind == "xml_id" and line_kind == "record":
+                    # External ids of a model are written before its records
+                    return
+
+    def _iter_xml_id(self, domain):
+        lst_model_name = list(self.dct_model)
+        for leaf in domain:
+            if isinstance(leaf, (list, tuple)) and list(leaf[:2]) == [
+                "model",
+                "=",
+            ]:
+                lst_model_name = [a for a in lst_model_name if a == leaf[2]]
+        for model_name in lst_model_name:
+            for value in self._iter_section(model_name, "xml_id"):
+                yield dict(value, model=model_name)
+
+    def _iter_records(self, model_name, id_min, id_max):
+        """Yield records of a model with an id from id_min to id_max.
+
+        The stream of the model continue from the previous request when all
+        ids before id_min are read, the file is read again otherwise. The
+        first record after id_max is kept for the next request.
+        """
+        if id_max is not None and id_max < id_min:
+            return
+        stream = self._dct_stream.get(model_name)
+        if stream is None or stream["id"] > id_min:
+            if stream is not None:
+                stream["iterator"].close()
+            # Records before id are read, next is the record read ahead
+            stream = {
+                "iterator": self._iter_section(model_name, "record"),
+                "next": None,
+                "id": 0,
+            }
+            self._dct_stream[model_name] = stream
+        while True:
+            value = stream["next"]
+            if value is None:
+                value = next(stream["iterator"], None)
+                if value is None:
+                    return
+                stream["next"] = value
+            record_id = value.get("id")
+            if id_max is not None and record_id > id_max:
+                return
+            stream["next"] = None
+            stream["id"] = record_id + 1
+            if record_id >= id_min:
+                yield value
+
+    def _search_record(self, model_name, method, domain, kwargs):
+        if kwargs.get("order", "id") != "id":
+            raise exceptions.Warning(
+                _("Snapshot records are only sorted by id.")
+            )
+        limit = kwargs.get("limit")
+        lst_field = kwargs.get("fields")
+        id_min, id_max = get_id_range(domain)
+        lst_v = []
+        for value in self._iter_records(model_name, id_min, id_max):
+            if not match_domain(value, domain):
+                continue
+            if lst_field:
+                value = {
+                    a: v
+                    for a, v in value.items()
+                    if a in lst_field or a == "id"
+                }
+            lst_v.append(value)
+            if limit and len(lst_v) >= limit:
+                break
+        if method == "search":
+            return [a.get("id") for a in lst_v]
+        return lst_v
+
+    def close(self):
+        for stream in self._dct_stream.values():
+            stream["iterator"].close()
+        self._dct_stream = {}
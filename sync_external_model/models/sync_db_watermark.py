@@ -0,0 +1,76 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+from odoo import api, fields, models
+
+
+class SyncDBWatermark(models.Model):
+    _name = "sync.db.watermark"
+    _description = "Sync db high-water mark by model"
+    _order = "model_name"
+
+    name = fields.Char(
+        compute="_compute_name",
+        store=True,
+    )
+
+    sync_db_id = fields.Many2one(
+        comodel_name="sync.db",
+        string="Sync DB",
+        required=True,
+        index=True,
+        ondelete="cascade",
+    )
+
+    model_name = fields.Char(required=True)
+
+    local_write_date = fields.Datetime(
+        help="Greatest write_date of local model at last sync.",
+    )
+
+    local_max_id = fields.Integer(
+        help="Greatest id of local model at last sync.",
+    )
+
+    remote_write_date = fields.Datetime(
+        help="Greatest write_date of remote model at last sync.",
+    )
+
+    remote_max_id = fields.Integer(
+        help="Greatest id of remote model at last sync.",
+    )
+
+    local_fingerprint = fields.Char(
+        help="Hash of ids and write_date of local model at last sync.",
+    )
+
+    remote_fingerprint = fields.Char(
+        help="Hash of ids and write_date of remote model at last sync.",
+    )
+
+    compare_hash = fields.Char(
+        help=(
+            "Hash of compared fields, domain and compare method at last sync,"
+            " a model is not skipped when its comparison changed."
+        ),
+    )
+
+    is_in_sync = fields.Boolean(
+        help=(
+            "No difference for this model at last sync, it's skipped while"
+            " both fingerprints don't change."
+        ),
+    )
+
+    _sql_constraints = [
+        (
+            "sync_db_model_uniq",
+            "unique(sync_db_id, model_name)",
+            "A watermark already exists for this model.",
+        ),
+    ]
+
+    @api.multi
+    @api.depends("model_name")
+    def _compute_name(self):
+        for rec in self:
+            rec.name = rec.model_name
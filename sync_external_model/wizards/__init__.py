@@ -0,0 +1,3 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl)
+
+from . import sync_db_benchmark, sync_db_snapshot
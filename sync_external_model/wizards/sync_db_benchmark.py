@@ -0,0 +1,363 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from odoo import SUPERUSER_ID, _, api, exceptions, fields, models
+
+_logger = logging.getLogger(__name__)
+
+BENCHMARK_MODEL = "sync.db.benchmark.record"
+BENCHMARK_REMOTE_MODEL = "sync.db.benchmark.remote"
+# Interval in second between samples of the memory of a phase
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def get_rss():
+    """Return the resident memory of the process in KB, 0 when unknown."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class RssSampler:
+    """Sample the resident memory of the process in a thread, to get the
+    growth of a phase instead of the high-water mark of the process."""
+
+    def __init__(self):
+        self.rss_start = get_rss()
+        self.rss_peak = self.rss_start
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            self.rss_peak = max(self.rss_peak, get_rss())
+
+    def stop(self):
+        """Stop sampling, return the peak growth in KB."""
+        self._stop.set()
+        self._thread.join()
+        self.rss_peak = max(self.rss_peak, get_rss())
+        return self.rss_peak - self.rss_start
+
+
+class FakeRemoteOdoo:
+    """In-process stand-in of odoorpc.ODOO used by the benchmark.
+
+    Requests are served by this database with its own cursor, like a
+    remote has its own transactions, and a model can be aliased to the
+    table of the fake remote. Requests and responses are serialized in
+    JSON like with jsonrpc, to count bytes and get the same types than a
+    real remote.
+    """
+
+    version = "12.0"
+
+    def __init__(self, registry, dct_alias):
+        self.dct_alias = dct_alias
+        self.rpc_count = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._cr = registry.cursor()
+        self._env = api.Environment(self._cr, SUPERUSER_ID, {})
+
+    def login(self, db, login, password):
+        return True
+
+    def json(self, url, params):
+        return {"result": {"uid": SUPERUSER_ID}}
+
+    def execute_kw(self, model_name, method, args, kwargs=None):
+        request = json.dumps([model_name, method, args, kwargs or {}])
+        with self._lock:
+            self.rpc_count += 1
+            self.bytes_sent += len(request)
+            model_name, method, args, kwargs = json.loads(request)
+            result = self._dispatch(model_name, method, args, kwargs)
+            if method in ("create", "write", "unlink"):
+                self._cr.commit()
+            response = json.dumps(result, default=str)
+            self.bytes_received += len(response)
+        return json.loads(response)
+
+    def _dispatch(self, model_name, method, args, kwargs):
+        if model_name == "sync.db" and method.startswith("get_sync_"):
+            args = [self.dct_alias.get(args[0], args[0])] + args[1:]
+        elif model_name == "ir.model" and method == "search_read":
+            # Only aliased models exist on the fake remote
+            args = [args[0] + [["model", "in", list(self.dct_alias)]]]
+        model = self._env[self.dct_alias.get(model_name, model_name)]
+        result = getattr(model, method)(*args, **kwargs)
+        if isinstance(result, models.BaseModel):
+            return result.ids
+        return result
+
+    def stats(self):
+        return {
+            "rpc_count": self.rpc_count,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "remote_sql_count": self._cr.sql_log_count,
+        }
+
+    def close(self):
+        self._cr.close()
+
+
+class SyncDBBenchmarkWizard(models.TransientModel):
+    _name = "sync.db.benchmark.wizard"
+    _description = "Benchmark sync with a fake remote Odoo"
+
+    record_count = fields.Integer(
+        default=10000,
+        required=True,
+        help="Number of synthetic records, on local, remote or both.",
+    )
+
+    local_only_ratio = fields.Float(
+        default=0.01,
+        help="Ratio of records missing on the fake remote.",
+    )
+
+    remote_only_ratio = fields.Float(
+        default=0.01,
+        help="Ratio of records missing on local.",
+    )
+
+    diff_ratio = fields.Float(
+        default=0.01,
+        help="Ratio of records with a different value on both sides.",
+    )
+
+    seed = fields.Integer(
+        default=1,
+        help="Change it to select other records as different.",
+    )
+
+    compare_method = fields.Selection(
+        selection=[
+            ("value", "All values"),
+            ("hash", "Hash of records"),
+        ],
+        default="value",
+        required=True,
+    )
+
+    page_size = fields.Integer(default=1000)
+
+    worker_count = fields.Integer(
+        default=1,
+        help=(
+            "Number of models compared in parallel, SQL queries of workers"
+            " are not counted."
+        ),
+    )
+
+    is_resolve_remote = fields.Boolean(
+        string="Resolve on remote",
+        default=True,
+        help="Measure the resolution on remote of found differences.",
+    )
+
+    keep_data = fields.Boolean(
+        help="Keep synthetic records and the sync with its results.",
+    )
+
+    report = fields.Text(readonly=True)
+
+    @api.multi
+    def action_run(self):
+        """Seed synthetic records, compare them with the fake remote and
+        report the cost of each phase."""
+        self.ensure_one()
+        total_ratio = (
+            self.local_only_ratio + self.remote_only_ratio + self.diff_ratio
+        )
+        if self.record_count <= 0 or total_ratio > 1:
+            raise exceptions.Warning(
+                _("Need records, and a sum of ratios lower than 1.")
+            )
+        lst_stat = []
+        sync_db = self.env["sync.db"].create(
+            {
+                "sync_host": "benchmark",
+                "module_name": "sync_external_model",
+                "compare_method": self.compare_method,
+                "page_size": self.page_size,
+                "worker_count": self.worker_count,
+            }
+        )
+        with self._measure("seed", None, lst_stat):
+            self._seed()
+        # The fake remote read with its own cursor
+        self.env.cr.commit()
+        try:
+            self._run_phases(sync_db, lst_stat)
+        except Exception:
+            # Synthetic records are committed, never leave them behind
+            self.env.cr.rollback()
+            self._clean(sync_db)
+            self.env.cr.commit()
+            raise
+        self.report = self._format_report(lst_stat)
+        if not self.keep_data:
+            self._clean(sync_db)
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def _run_phases(self, sync_db, lst_stat):
+        fake = FakeRemoteOdoo(
+            self.pool, {BENCHMARK_MODEL: BENCHMARK_REMOTE_MODEL}
+        )
+        try:
+            sync_db = sync_db.with_context(sync_db_remote=fake)
+            with self._measure("compare", fake, lst_stat):
+                sync_db.action_sync()
+            if self.is_resolve_remote:
+                results = self.env["sync.db.result"].search(
+                    [
+                        (
+                            "sync_db_run_id",
+                            "=",
+                            sync_db.sync_db_run_ids[:1].id,
+                        ),
+                        ("model_name", "=", BENCHMARK_MODEL),
+                        (
+                            "resolution",
+                            "in",
+                            ["solution_remote", "solution_remote_local"],
+                        ),
+                    ]
+                )
+                if results:
+                    with self._measure("sync_remote", fake, lst_stat):
+                        results.with_context(sync_db_remote=fake).sync_remote()
+        finally:
+            fake.close()
+
+    def _clean(self, sync_db):
+        sync_db.exists().unlink()
+        self._truncate()
+
+    @contextmanager
+    def _measure(self, phase, fake, lst_stat):
+        dct_before = fake.stats() if fake else {}
+        sql_count = self.env.cr.sql_log_count
+        sampler = RssSampler()
+        start = time.time()
+        try:
+            yield
+        finally:
+            rss_growth = sampler.stop()
+        dct_stat = {
+            "phase": phase,
+            "time": time.time() - start,
+            "sql_count": self.env.cr.sql_log_count - sql_count,
+            "rpc_count": 0,
+            "bytes_sent": 0,
+            "bytes_received": 0,
+            "remote_sql_count": 0,
+            # Peak growth of resident memory during the phase, in KB
+            "peak_rss": rss_growth,
+        }
+        if fake:
+            for key, value in fake.stats().items():
+                dct_stat[key] = value - dct_before[key]
+        lst_stat.append(dct_stat)
+        _logger.info(f"Sync benchmark {json.dumps(dct_stat)}")
+
+    def _truncate(self):
+        self.env.cr.execute(
+            f'TRUNCATE "{self.env[BENCHMARK_MODEL]._table}",'
+            f' "{self.env[BENCHMARK_REMOTE_MODEL]._table}" RESTART IDENTITY'
+        )
+
+    def _seed(self):
+        """Insert synthetic records on local and on the fake remote.
+
+        Each id is randomly only on local, only on remote, different or
+        equal, depending of the ratios, the same seed give the same
+        records.
+        """
+        self._truncate()
+        local_only = self.local_only_ratio
+        remote_only = local_only + self.remote_only_ratio
+        diff = remote_only + self.diff_ratio
+        for model_name, value, where in (
+            (
+                BENCHMARK_MODEL,
+                "i",
+                f"NOT (r >= {local_only} AND r < {remote_only})",
+            ),
+            (
+                BENCHMARK_REMOTE_MODEL,
+                f"CASE WHEN r >= {remote_only} AND r < {diff}"
+                " THEN i + 1 ELSE i END",
+                f"r >= {local_only}",
+            ),
+        ):
+            table = self.env[model_name]._table
+            self.env.cr.execute(
+                f"""
+                WITH sample AS (
+                    SELECT i,
+                        mod(i * 2654435761 + %(seed)s, 1000003)::float
+                            / 1000003 AS r
+                    FROM generate_series(1, %(count)s) AS i
+                )
+                INSERT INTO "{table}" (
+                    id, name, value, amount, note, is_active, date,
+                    create_uid, create_date, write_uid, write_date
+                )
+                SELECT i, 'Record ' || i, {value}, i / 100.0, md5(i::text),
+                    i %% 2 = 0, DATE '2020-01-01' + (i %% 1000),
+                    %(uid)s, now() at time zone 'UTC',
+                    %(uid)s, now() at time zone 'UTC'
+                FROM sample
+                WHERE {where}
+                """,
+                {
+                    "seed": self.seed,
+                    "count": self.record_count,
+                    "uid": self.env.uid,
+                },
+            )
+            self.env.cr.execute(
+                f"SELECT setval('{table}_id_seq', %s)", (self.record_count,)
+            )
+
+    @api.model
+    def _format_report(self, lst_stat):
+        lst_line = [
+            f"{'Phase':<12}{'Time (s)':>10}{'RPC':>8}{'Sent (KB)':>12}"
+            f"{'Recv (KB)':>12}{'SQL':>8}{'Remote SQL':>12}"
+            f"{'RSS growth (MB)':>17}"
+        ]
+        for dct_stat in lst_stat:
+            lst_line.append(
+                f"{dct_stat.get('phase'):<12}"
+                f"{dct_stat.get('time'):>10.2f}"
+                f"{dct_stat.get('rpc_count'):>8}"
+                f"{dct_stat.get('bytes_sent') / 1024:>12.1f}"
+                f"{dct_stat.get('bytes_received') / 1024:>12.1f}"
+                f"{dct_stat.get('sql_count'):>8}"
+                f"{dct_stat.get('remote_sql_count'):>12}"
+                f"{dct_stat.get('peak_rss') / 1024:>17.1f}"
+            )
+        return "\n".join(lst_line)
@@ -0,0 +1,68 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+from odoo import _, api, exceptions, fields, models
+
+from ..models.sync_db import DEFAULT_PAGE_SIZE
+from ..models.sync_db_snapshot_file import get_snapshot_dir
+
+
+class SyncDBSnapshotWizard(models.TransientModel):
+    _name = "sync.db.snapshot.wizard"
+    _description = "Dump a snapshot compared offline by another instance"
+
+    module_name = fields.Char(
+        required=True,
+        help="Separate by ; for multiple module.",
+    )
+
+    path = fields.Char(
+        string="File name",
+        required=True,
+        default="sync_db_snapshot.ndjson.gz",
+        help=(
+            "File written in the snapshot directory of this server, in the"
+            " data directory, give it to the instance comparing with it in"
+            " its Snapshot file."
+        ),
+    )
+
+    snapshot_dir = fields.Char(
+        string="Snapshot directory",
+        default=lambda self: get_snapshot_dir(),
+        readonly=True,
+    )
+
+    page_size = fields.Integer(
+        default=DEFAULT_PAGE_SIZE,
+        required=True,
+        help="Number of records read and written together.",
+    )
+
+    report = fields.Text(readonly=True)
+
+    @api.multi
+    def action_dump(self):
+        """Write the snapshot of modules in the file."""
+        self.ensure_one()
+        if not self.env.user.has_group("base.group_system"):
+            raise exceptions.AccessError(
+                _("Only administrators can dump a snapshot.")
+            )
+        self.env["sync.db"].check_access_rights("write")
+        if self.page_size <= 0:
+            raise exceptions.Warning(_("Page size must be positive."))
+        dct_stat = self.env["sync.db"]._dump_sync_snapshot(
+            self.module_name, self.path, page_size=self.page_size
+        )
+        self.report = _("{} models and {} records written in {}").format(
+            dct_stat.get("model_count"),
+            dct_stat.get("record_count"),
+            dct_stat.get("path"),
+        )
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }